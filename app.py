@@ -4,24 +4,24 @@ AdTech Campaign Performance Analysis & Reporting Tool
 """
 import streamlit as st
 import pandas as pd
+import hashlib
+import io
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-# Add src to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+# Add src to path (idempotent - reruns must not grow sys.path)
+_SRC_DIR = os.path.join(os.path.dirname(__file__), 'src')
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
 
-# Import custom modules
+# Import custom modules. src.insights (openai / google-generativeai SDKs),
+# src.report_gen (reportlab / python-pptx) and src.visualize (matplotlib)
+# are imported lazily inside the handlers that need them to keep cold
+# start fast.
 from src.ingest import load_csv, preview_data
-from src.process import clean_data, calculate_kpis, get_summary_metrics
-from src.insights import (
-    generate_insights_openai, 
-    generate_insights_gemini, 
-    generate_fallback_insights,
-    format_insights_for_display
-)
-from src.visualize import generate_all_charts
-from src.report_gen import create_pdf_report, create_pptx_report
+from src.process import process_all
 from src.utils import ensure_output_dir, get_timestamp
 
 
@@ -33,8 +33,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for enhanced UI
-st.markdown("""
+# Custom CSS for enhanced UI (module-level constant, injected once per session)
+_CSS = """
 <style>
     /* Main container styling */
     .main {
@@ -236,25 +236,557 @@ st.markdown("""
         transform: translateY(-2px);
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+
+@st.cache_resource
+def _inject_css():
+    """Ship the CSS blob to the browser once instead of on every rerun."""
+    st.markdown(_CSS, unsafe_allow_html=True)
+
+
+@st.cache_data(persist="disk", show_spinner=False, max_entries=4)
+def _cached_load_csv(file_bytes: bytes, name: str):
+    """Load a CSV from raw upload bytes, cached on content.
+
+    Streamlit hashes the bytes argument, so re-uploading the same file
+    (or any unrelated widget rerun) skips the pandas parse entirely.
+    max_entries bounds how many parsed uploads are kept in memory.
+    """
+    return load_csv(io.BytesIO(file_bytes))
+
+
+@st.cache_data(show_spinner=False)
+def _process(data_id: str, _df: pd.DataFrame):
+    """Cached wrapper around the fused clean/KPI/summary pipeline.
+
+    Keyed on the upload's content hash (data_id) rather than the frame
+    itself - the underscore prefix stops Streamlit re-hashing the whole
+    DataFrame (an O(rows) scan) on every call.
+    """
+    return process_all(_df)
+
+
+@st.cache_data(persist="disk", show_spinner=False)
+def _cached_charts(df_kpi: pd.DataFrame, output_dir: str) -> dict:
+    """Cached wrapper around generate_all_charts.
+
+    Keyed on the KPI DataFrame content; persisted to disk so charts for
+    the same data survive app restarts instead of re-rendering.
+    """
+    from src.visualize import generate_all_charts
+    return generate_all_charts(df_kpi, output_dir)
+
+
+def _load_chart_bytes(charts: dict) -> dict:
+    """Read each generated chart PNG once so reruns display from memory.
+
+    Serving bytes to st.image avoids re-stat'ing, re-reading and
+    re-hashing the files on every rerun of the Insights tab.
+    """
+    chart_bytes = {}
+    for name, path in charts.items():
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                chart_bytes[name] = f.read()
+    return chart_bytes
+
+
+def _put_df(name: str, df: pd.DataFrame) -> None:
+    """Store a DataFrame in session_state as Arrow IPC (feather) bytes.
+
+    Arrow bytes are far cheaper for Streamlit to copy/serialize across
+    reruns than live pandas objects, and usually smaller than pickle.
+    """
+    buf = io.BytesIO()
+    df.reset_index(drop=True).to_feather(buf)
+    st.session_state[name] = buf.getvalue()
+
+
+def _get_df(name: str):
+    """Rehydrate a DataFrame stored by _put_df, or None if absent."""
+    raw = st.session_state.get(name)
+    if raw is None:
+        return None
+    return pd.read_feather(io.BytesIO(raw))
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _build_report(fmt: str, summary, insights: dict, charts: dict) -> bytes:
+    """Assemble a report in memory and return its bytes.
+
+    Both reportlab and python-pptx accept file-like targets, so the
+    report is built straight into a BytesIO. Cached on (format, summary,
+    insights, charts) - re-clicks with unchanged inputs skip the whole
+    assembly and the bytes feed st.download_button with no disk round-trip.
+    """
+    from src.report_gen import create_pdf_report, create_pptx_report
+
+    buf = io.BytesIO()
+    if fmt == "PDF":
+        create_pdf_report(summary.to_dict(), insights, charts, buf)
+    else:
+        create_pptx_report(summary.to_dict(), insights, charts, buf)
+    return buf.getvalue()
+
+
+@st.fragment
+def _tab_upload():
+    """Tab 1: data upload, cleaning and KPI calculation."""
+    st.markdown("## 📥 Upload Campaign Data")
+    
+    # Create two columns for layout
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        uploaded_file = st.file_uploader(
+            "Choose a CSV file",
+            type=['csv'],
+            help="Upload your AdTech campaign data in CSV format"
+        )
+    
+    with col2:
+        st.markdown("""
+        <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                    padding: 20px; border-radius: 10px; color: white; text-align: center;'>
+            <h4 style='margin: 0; color: white;'>📊 Sample Data</h4>
+            <p style='margin: 10px 0; font-size: 0.9rem;'>Use our sample CSV to test the app immediately!</p>
+            <p style='margin: 0; font-size: 0.8rem;'>Location: data/sample_campaign_data.csv</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    if uploaded_file is not None:
+        # Read the upload bytes once per file; the byte string doubles as
+        # a stable cache key for every downstream @st.cache_data wrapper.
+        # Keyed on the uploader's per-upload file_id, not the filename -
+        # re-uploading a modified file under the same name must not serve
+        # the previous file's bytes
+        if st.session_state.get('raw_file_id') != uploaded_file.file_id:
+            st.session_state.raw_bytes = uploaded_file.getvalue()
+            st.session_state.raw_name = uploaded_file.name
+            st.session_state.raw_file_id = uploaded_file.file_id
+            st.session_state.data_id = hashlib.blake2b(
+                st.session_state.raw_bytes, digest_size=16
+            ).hexdigest()
+
+        # Load data (cached on file bytes so reruns skip the parse)
+        df = _cached_load_csv(st.session_state.raw_bytes, st.session_state.raw_name)
+        
+        if df is not None:
+            _put_df('df_raw', df)
+            
+            st.markdown("""
+            <div class='success-box'>
+                <h4 style='margin: 0; color: white;'>✅ Data Loaded Successfully!</h4>
+                <p style='margin: 10px 0 0 0; font-size: 1.1rem;'>
+                    <strong>{} rows</strong> × <strong>{} columns</strong>
+                </p>
+            </div>
+            """.format(df.shape[0], df.shape[1]), unsafe_allow_html=True)
+            
+            # Preview raw data
+            st.markdown("### 👀 Data Preview")
+            preview_data(df, "Raw Data", rows=10)
+            
+            # Clean and process button
+            st.markdown("<br>", unsafe_allow_html=True)
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col2:
+                if st.button("🧹 Clean & Process Data", use_container_width=True, type="primary"):
+                    with st.spinner("🔄 Cleaning and processing data..."):
+                        # Fused clean -> KPI -> summary pipeline (cached -
+                        # repeat clicks are a lookup)
+                        df_clean, df_kpi, summary = _process(st.session_state.data_id, df)
+                        _put_df('df_clean', df_clean)
+
+                        # Arrow-backed dtypes make the st.dataframe /
+                        # cache round-trips zero-copy
+                        df_kpi = df_kpi.convert_dtypes(dtype_backend="pyarrow")
+
+                        _put_df('df_kpi', df_kpi)
+
+                        # Precompute the sample string used for AI prompts
+                        # so Tab 3 doesn't re-run the formatter per click.
+                        # Head+middle+tail CSV covers the whole date range
+                        # in a fraction of the prompt tokens
+                        from src.insights import build_sample
+                        st.session_state.df_sample = build_sample(df_kpi)
+
+                        st.session_state.summary = summary
+                        
+                        st.success("✅ Data cleaned and KPIs calculated successfully!")
+                        st.balloons()
+                        # Full-app rerun so the other (fragmented) tabs
+                        # pick up the freshly written session state
+                        st.rerun()
+    
+    # Show cleaned data if available
+    if st.session_state.df_clean is not None:
+        st.divider()
+        st.markdown("### ✨ Cleaned Data")
+        preview_data(_get_df('df_clean'), "Cleaned Data Preview", rows=10)
+
+
+@st.fragment
+def _tab_analysis():
+    """Tab 2: KPI dashboard and chart generation."""
+    st.markdown("## 📊 Performance Analysis & KPIs")
+    
+    if st.session_state.summary is not None:
+        summary = st.session_state.summary.to_dict()
+
+        # Hero metrics section
+        st.markdown("""
+        <div style='text-align: center; padding: 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                    border-radius: 15px; margin-bottom: 30px; color: white;'>
+            <h2 style='margin: 0; color: white;'>📈 Campaign Performance Dashboard</h2>
+            <p style='margin: 10px 0 0 0; font-size: 1.1rem; opacity: 0.9;'>Key metrics at a glance</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Display key metrics in columns with better styling
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            if 'total_impressions' in summary:
+                st.metric("👁️ Total Impressions", f"{summary['total_impressions']:,.0f}")
+            if 'total_clicks' in summary:
+                st.metric("🖱️ Total Clicks", f"{summary['total_clicks']:,.0f}")
+        
+        with col2:
+            if 'overall_CTR' in summary:
+                st.metric("📊 CTR", f"{summary['overall_CTR']:.2f}%")
+            if 'overall_CPC' in summary:
+                st.metric("💵 CPC", f"${summary['overall_CPC']:.2f}")
+        
+        with col3:
+            if 'total_spend' in summary:
+                st.metric("💰 Total Spend", f"${summary['total_spend']:,.2f}")
+            if 'overall_CPM' in summary:
+                st.metric("📈 CPM", f"${summary['overall_CPM']:.2f}")
+        
+        with col4:
+            if 'total_conversions' in summary:
+                st.metric("✅ Conversions", f"{summary['total_conversions']:,.0f}")
+            if 'overall_ROAS' in summary:
+                st.metric("🎯 ROAS", f"{summary['overall_ROAS']:.2f}x")
+        
+        st.divider()
+        
+        # Show KPI data table
+        if st.session_state.df_kpi is not None:
+            df_kpi = _get_df('df_kpi')
+            st.markdown("### 📋 Detailed KPI Data")
+
+            # Bound how many rows get serialized to the browser; large
+            # campaign files would otherwise ship the whole frame per rerun
+            if len(df_kpi) > 100:
+                n_rows = st.slider(
+                    "Rows to display",
+                    min_value=100,
+                    max_value=min(len(df_kpi), 50_000),
+                    value=min(1000, len(df_kpi))
+                )
+            else:
+                n_rows = len(df_kpi)
+            st.dataframe(df_kpi.head(n_rows), use_container_width=True, height=400)
+            
+            st.markdown("<br>", unsafe_allow_html=True)
+            
+            # Generate visualizations
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col2:
+                if st.button("📈 Generate Visualizations", use_container_width=True, type="primary"):
+                    with st.spinner("🎨 Creating professional charts..."):
+                        output_dir = ensure_output_dir("output")
+                        charts = _cached_charts(df_kpi, output_dir)
+                        st.session_state.charts = charts
+                        st.session_state.chart_bytes = _load_chart_bytes(charts)
+                        st.success("✅ Charts generated successfully!")
+                        st.balloons()
+                        # Full-app rerun so the other (fragmented) tabs
+                        # pick up the freshly written session state
+                        st.rerun()
+    else:
+        st.markdown("""
+        <div class='info-box'>
+            <h3 style='margin: 0; color: white;'>👆 Getting Started</h3>
+            <p style='margin: 10px 0 0 0;'>Please upload and process data first in the 'Upload Data' tab.</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+
+@st.fragment
+def _tab_insights(ai_provider: str, api_key):
+    """Tab 3: AI insight generation and chart display."""
+    st.markdown("## 🤖 AI-Powered Insights")
+    
+    if st.session_state.summary is not None:
+        # Info box about AI provider
+        if ai_provider != "None (Rule-based)" and not api_key:
+            st.markdown("""
+            <div style='background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); 
+                        padding: 20px; border-radius: 15px; color: white; margin-bottom: 20px;'>
+                <h4 style='margin: 0; color: white;'>⚠️ API Key Required</h4>
+                <p style='margin: 10px 0 0 0;'>Please enter your API key in the sidebar or select "None (Rule-based)" to continue.</p>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            if st.button("🤖 Generate AI Insights", use_container_width=True, type="primary"):
+                with st.spinner("🧠 Analyzing data and generating insights..."):
+                    # Prepare data for AI (precomputed in Tab 1)
+                    from src.insights import build_sample
+                    df_sample = st.session_state.get('df_sample') or \
+                        build_sample(_get_df('df_kpi'))
+                    summary = st.session_state.summary
+                    
+                    # Generate insights based on provider (cached per
+                    # summary/sample/model via the module's own disk
+                    # cache, so re-clicks skip the API call). The call is
+                    # deliberately not wrapped in st.cache_data: elements
+                    # drawn into the placeholder from inside a cached
+                    # function would be recorded for replay and crash on
+                    # cache hits. While a fresh response streams in, the
+                    # raw text is echoed into a placeholder so the user
+                    # sees progress instead of a frozen spinner.
+                    stream_view = st.empty()
+                    _show = lambda text: stream_view.code(text, language="json")
+                    try:
+                        if ai_provider == "OpenAI GPT-4" and api_key:
+                            from src.insights import generate_insights_openai
+                            insights = generate_insights_openai(
+                                summary.to_dict(), df_sample, api_key,
+                                on_chunk=_show, raise_on_error=True)
+                        elif ai_provider == "Google Gemini" and api_key:
+                            from src.insights import generate_insights_gemini
+                            insights = generate_insights_gemini(
+                                summary.to_dict(), df_sample, api_key,
+                                on_chunk=_show, raise_on_error=True)
+                        else:
+                            from src.insights import generate_fallback_insights
+                            insights = generate_fallback_insights(summary.to_dict())
+                    except Exception as e:
+                        # raise_on_error keeps failures out of the disk
+                        # cache; the fallback is shown for this run only
+                        st.warning(f"⚠️ AI request failed ({e}) - showing rule-based insights instead.")
+                        from src.insights import generate_fallback_insights
+                        insights = generate_fallback_insights(summary.to_dict())
+
+                    stream_view.empty()
+                    st.session_state.insights = insights
+                    st.success("✅ Insights generated successfully!")
+                    st.balloons()
+                    # Full-app rerun so the other (fragmented) tabs
+                    # pick up the freshly written session state
+                    st.rerun()
+        
+        st.markdown("<br>", unsafe_allow_html=True)
+        
+        # Display insights if available
+        if st.session_state.insights is not None:
+            insights = st.session_state.insights
+            
+            # Key Insights
+            if insights.get('key_insights'):
+                st.markdown("""
+                <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                            padding: 25px; border-radius: 15px; margin: 20px 0; color: white;'>
+                    <h3 style='margin: 0 0 15px 0; color: white;'>🔍 Key Insights</h3>
+                """, unsafe_allow_html=True)
+                
+                for i, insight in enumerate(insights['key_insights'], 1):
+                    st.markdown(f"<p style='color: white; margin: 10px 0; font-size: 1.05rem;'><strong>{i}.</strong> {insight}</p>", unsafe_allow_html=True)
+                
+                st.markdown("</div>", unsafe_allow_html=True)
+            
+            # Trend Analysis
+            if insights.get('trends'):
+                st.markdown("""
+                <div style='background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); 
+                            padding: 25px; border-radius: 15px; margin: 20px 0; color: white;'>
+                    <h3 style='margin: 0 0 15px 0; color: white;'>📈 Trend Analysis</h3>
+                """, unsafe_allow_html=True)
+                
+                for i, trend in enumerate(insights['trends'], 1):
+                    st.markdown(f"<p style='color: white; margin: 10px 0; font-size: 1.05rem;'><strong>{i}.</strong> {trend}</p>", unsafe_allow_html=True)
+                
+                st.markdown("</div>", unsafe_allow_html=True)
+            
+            # Performance Issues
+            if insights.get('issues'):
+                st.markdown("""
+                <div style='background: linear-gradient(135deg, #fa709a 0%, #fee140 100%); 
+                            padding: 25px; border-radius: 15px; margin: 20px 0; color: #333;'>
+                    <h3 style='margin: 0 0 15px 0; color: #333;'>⚠️ Performance Issues</h3>
+                """, unsafe_allow_html=True)
+                
+                for i, issue in enumerate(insights['issues'], 1):
+                    st.markdown(f"<p style='color: #333; margin: 10px 0; font-size: 1.05rem;'><strong>{i}.</strong> {issue}</p>", unsafe_allow_html=True)
+                
+                st.markdown("</div>", unsafe_allow_html=True)
+            
+            # Recommendations
+            if insights.get('recommendations'):
+                st.markdown("""
+                <div style='background: linear-gradient(135deg, #56ab2f 0%, #a8e063 100%); 
+                            padding: 25px; border-radius: 15px; margin: 20px 0; color: white;'>
+                    <h3 style='margin: 0 0 15px 0; color: white;'>💡 Actionable Recommendations</h3>
+                """, unsafe_allow_html=True)
+                
+                for i, rec in enumerate(insights['recommendations'], 1):
+                    st.markdown(f"<p style='color: white; margin: 10px 0; font-size: 1.05rem;'><strong>{i}.</strong> {rec}</p>", unsafe_allow_html=True)
+                
+                st.markdown("</div>", unsafe_allow_html=True)
+    else:
+        st.markdown("""
+        <div class='info-box'>
+            <h3 style='margin: 0; color: white;'>👆 Getting Started</h3>
+            <p style='margin: 10px 0 0 0;'>Please upload and process data first.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Show charts if available
+    if st.session_state.charts is not None:
+        st.divider()
+        st.markdown("### 📊 Performance Visualizations")
+        
+        chart_bytes = st.session_state.get('chart_bytes')
+        if chart_bytes is None:
+            chart_bytes = _load_chart_bytes(st.session_state.charts)
+            st.session_state.chart_bytes = chart_bytes
+
+        for chart_name, data in chart_bytes.items():
+            st.image(data, use_container_width=True)
+            st.markdown("<br>", unsafe_allow_html=True)
+
+
+@st.fragment
+def _tab_reports(report_format: str):
+    """Tab 4: PDF/PPTX report generation and download."""
+    st.markdown("## 📄 Generate Executive Report")
+    
+    if st.session_state.summary and st.session_state.insights:
+        # Report format display
+        st.markdown(f"""
+        <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                    padding: 25px; border-radius: 15px; color: white; text-align: center; margin-bottom: 30px;'>
+            <h3 style='margin: 0; color: white;'>📊 Report Configuration</h3>
+            <p style='margin: 15px 0 0 0; font-size: 1.2rem;'><strong>Selected Format:</strong> {report_format}</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            if st.button("📄 Generate Report", use_container_width=True, type="primary"):
+                with st.spinner("📝 Generating professional report..."):
+                    output_dir = ensure_output_dir("output")
+                    timestamp = get_timestamp()
+                    
+                    # Ensure charts are generated
+                    if st.session_state.charts is None:
+                        charts = _cached_charts(_get_df('df_kpi'), output_dir)
+                        st.session_state.charts = charts
+                        st.session_state.chart_bytes = _load_chart_bytes(charts)
+                    
+                    report_files = []
+                    futures = []
+
+                    # Build both formats concurrently - they are fully
+                    # independent and mostly I/O + image-encode bound.
+                    # _build_report is cached, so unchanged inputs are a
+                    # lookup instead of a rebuild
+                    with ThreadPoolExecutor(max_workers=2) as executor:
+                        if report_format in ["PDF", "Both"]:
+                            pdf_path = os.path.join(output_dir, f"campaign_report_{timestamp}.pdf")
+                            futures.append(("PDF", pdf_path, executor.submit(
+                                _build_report, "PDF",
+                                st.session_state.summary,
+                                st.session_state.insights,
+                                st.session_state.charts
+                            )))
+
+                        if report_format in ["PowerPoint (PPTX)", "Both"]:
+                            pptx_path = os.path.join(output_dir, f"campaign_report_{timestamp}.pptx")
+                            futures.append(("PPTX", pptx_path, executor.submit(
+                                _build_report, "PPTX",
+                                st.session_state.summary,
+                                st.session_state.insights,
+                                st.session_state.charts
+                            )))
+
+                        for format_name, file_path, future in futures:
+                            report_bytes = future.result()
+                            with open(file_path, "wb") as f:
+                                f.write(report_bytes)
+                            report_files.append((format_name, file_path, report_bytes))
+                    
+                    st.success("✅ Report generated successfully!")
+                    st.balloons()
+                    
+                    # Download section
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    st.markdown("""
+                    <div style='background: linear-gradient(135deg, #56ab2f 0%, #a8e063 100%); 
+                                padding: 25px; border-radius: 15px; color: white; text-align: center;'>
+                        <h3 style='margin: 0; color: white;'>📥 Download Your Reports</h3>
+                        <p style='margin: 10px 0 0 0;'>Your professional reports are ready!</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    
+                    # Download buttons in columns
+                    download_cols = st.columns(len(report_files))
+                    
+                    for idx, (format_name, file_path, file_data) in enumerate(report_files):
+                        with download_cols[idx]:
+                            file_name = os.path.basename(file_path)
+
+                            st.download_button(
+                                label=f"⬇️ Download {format_name}",
+                                data=file_data,
+                                file_name=file_name,
+                                mime="application/pdf" if format_name == "PDF" else "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                                use_container_width=True
+                            )
+    else:
+        st.markdown("""
+        <div class='info-box'>
+            <h3 style='margin: 0; color: white;'>📋 Checklist Before Generating Report</h3>
+            <p style='margin: 15px 0 10px 0;'>Complete these steps first:</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Show checklist with better styling
+        checklist_items = [
+            ("Upload data", st.session_state.df_raw is not None),
+            ("Clean & process data", st.session_state.df_clean is not None),
+            ("Calculate KPIs", st.session_state.summary is not None),
+            ("Generate insights", st.session_state.insights is not None)
+        ]
+        
+        for item, completed in checklist_items:
+            icon = "✅" if completed else "❌"
+            color = "#56ab2f" if completed else "#f5576c"
+            st.markdown(f"""
+            <div style='background: {color}; color: white; padding: 15px; 
+                        border-radius: 10px; margin: 10px 0; font-size: 1.1rem;'>
+                {icon} <strong>{item}</strong>
+            </div>
+            """, unsafe_allow_html=True)
 
 
 def main():
     """Main application function."""
-    
+
+    # Inject custom CSS (cached - only sent to the browser once)
+    _inject_css()
+
     # Initialize session state variables
-    if 'df_raw' not in st.session_state:
-        st.session_state.df_raw = None
-    if 'df_clean' not in st.session_state:
-        st.session_state.df_clean = None
-    if 'df_kpi' not in st.session_state:
-        st.session_state.df_kpi = None
-    if 'summary' not in st.session_state:
-        st.session_state.summary = None
-    if 'insights' not in st.session_state:
-        st.session_state.insights = None
-    if 'charts' not in st.session_state:
-        st.session_state.charts = None
+    for key in ('df_raw', 'df_clean', 'df_kpi', 'summary', 'insights', 'charts'):
+        st.session_state.setdefault(key, None)
     
     # Header
     st.markdown('<div class="main-header">📊 Automated Insight Engine</div>', unsafe_allow_html=True)
@@ -329,384 +861,25 @@ def main():
         </div>
         """, unsafe_allow_html=True)
     
-    # Initialize session state
-    if 'df_raw' not in st.session_state:
-        st.session_state.df_raw = None
-    if 'df_clean' not in st.session_state:
-        st.session_state.df_clean = None
-    if 'df_kpi' not in st.session_state:
-        st.session_state.df_kpi = None
-    if 'summary' not in st.session_state:
-        st.session_state.summary = None
-    if 'insights' not in st.session_state:
-        st.session_state.insights = None
-    if 'charts' not in st.session_state:
-        st.session_state.charts = None
-    
     # Main content area
     tab1, tab2, tab3, tab4 = st.tabs(["📥 Upload Data", "📊 Analysis", "🤖 Insights", "📄 Reports"])
     
     # Tab 1: Data Upload
     with tab1:
-        st.markdown("## 📥 Upload Campaign Data")
-        
-        # Create two columns for layout
-        col1, col2 = st.columns([2, 1])
-        
-        with col1:
-            uploaded_file = st.file_uploader(
-                "Choose a CSV file",
-                type=['csv'],
-                help="Upload your AdTech campaign data in CSV format"
-            )
-        
-        with col2:
-            st.markdown("""
-            <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                        padding: 20px; border-radius: 10px; color: white; text-align: center;'>
-                <h4 style='margin: 0; color: white;'>📊 Sample Data</h4>
-                <p style='margin: 10px 0; font-size: 0.9rem;'>Use our sample CSV to test the app immediately!</p>
-                <p style='margin: 0; font-size: 0.8rem;'>Location: data/sample_campaign_data.csv</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        if uploaded_file is not None:
-            # Load data
-            df = load_csv(uploaded_file)
-            
-            if df is not None:
-                st.session_state.df_raw = df
-                
-                st.markdown("""
-                <div class='success-box'>
-                    <h4 style='margin: 0; color: white;'>✅ Data Loaded Successfully!</h4>
-                    <p style='margin: 10px 0 0 0; font-size: 1.1rem;'>
-                        <strong>{} rows</strong> × <strong>{} columns</strong>
-                    </p>
-                </div>
-                """.format(df.shape[0], df.shape[1]), unsafe_allow_html=True)
-                
-                # Preview raw data
-                st.markdown("### 👀 Data Preview")
-                preview_data(df, "Raw Data", rows=10)
-                
-                # Clean and process button
-                st.markdown("<br>", unsafe_allow_html=True)
-                col1, col2, col3 = st.columns([1, 2, 1])
-                with col2:
-                    if st.button("🧹 Clean & Process Data", use_container_width=True, type="primary"):
-                        with st.spinner("🔄 Cleaning and processing data..."):
-                            # Clean data
-                            df_clean = clean_data(df)
-                            st.session_state.df_clean = df_clean
-                            
-                            # Calculate KPIs
-                            df_kpi = calculate_kpis(df_clean)
-                            st.session_state.df_kpi = df_kpi
-                            
-                            # Get summary metrics
-                            summary = get_summary_metrics(df_kpi)
-                            st.session_state.summary = summary
-                            
-                            st.success("✅ Data cleaned and KPIs calculated successfully!")
-                            st.balloons()
-                            st.rerun()
-        
-        # Show cleaned data if available
-        if st.session_state.df_clean is not None:
-            st.divider()
-            st.markdown("### ✨ Cleaned Data")
-            preview_data(st.session_state.df_clean, "Cleaned Data Preview", rows=10)
-    
+        _tab_upload()
+
     # Tab 2: Analysis & KPIs
     with tab2:
-        st.markdown("## 📊 Performance Analysis & KPIs")
-        
-        if st.session_state.summary is not None:
-            summary = st.session_state.summary
-            
-            # Hero metrics section
-            st.markdown("""
-            <div style='text-align: center; padding: 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                        border-radius: 15px; margin-bottom: 30px; color: white;'>
-                <h2 style='margin: 0; color: white;'>📈 Campaign Performance Dashboard</h2>
-                <p style='margin: 10px 0 0 0; font-size: 1.1rem; opacity: 0.9;'>Key metrics at a glance</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Display key metrics in columns with better styling
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                if 'total_impressions' in summary:
-                    st.metric("👁️ Total Impressions", f"{summary['total_impressions']:,.0f}")
-                if 'total_clicks' in summary:
-                    st.metric("🖱️ Total Clicks", f"{summary['total_clicks']:,.0f}")
-            
-            with col2:
-                if 'overall_CTR' in summary:
-                    st.metric("📊 CTR", f"{summary['overall_CTR']:.2f}%")
-                if 'overall_CPC' in summary:
-                    st.metric("💵 CPC", f"${summary['overall_CPC']:.2f}")
-            
-            with col3:
-                if 'total_spend' in summary:
-                    st.metric("💰 Total Spend", f"${summary['total_spend']:,.2f}")
-                if 'overall_CPM' in summary:
-                    st.metric("📈 CPM", f"${summary['overall_CPM']:.2f}")
-            
-            with col4:
-                if 'total_conversions' in summary:
-                    st.metric("✅ Conversions", f"{summary['total_conversions']:,.0f}")
-                if 'overall_ROAS' in summary:
-                    st.metric("🎯 ROAS", f"{summary['overall_ROAS']:.2f}x")
-            
-            st.divider()
-            
-            # Show KPI data table
-            if st.session_state.df_kpi is not None:
-                st.markdown("### 📋 Detailed KPI Data")
-                st.dataframe(st.session_state.df_kpi, use_container_width=True, height=400)
-                
-                st.markdown("<br>", unsafe_allow_html=True)
-                
-                # Generate visualizations
-                col1, col2, col3 = st.columns([1, 2, 1])
-                with col2:
-                    if st.button("📈 Generate Visualizations", use_container_width=True, type="primary"):
-                        with st.spinner("🎨 Creating professional charts..."):
-                            output_dir = ensure_output_dir("output")
-                            charts = generate_all_charts(st.session_state.df_kpi, output_dir)
-                            st.session_state.charts = charts
-                            st.success("✅ Charts generated successfully!")
-                            st.balloons()
-                            st.rerun()
-        else:
-            st.markdown("""
-            <div class='info-box'>
-                <h3 style='margin: 0; color: white;'>👆 Getting Started</h3>
-                <p style='margin: 10px 0 0 0;'>Please upload and process data first in the 'Upload Data' tab.</p>
-            </div>
-            """, unsafe_allow_html=True)
-    
+        _tab_analysis()
+
     # Tab 3: AI Insights
     with tab3:
-        st.markdown("## 🤖 AI-Powered Insights")
-        
-        if st.session_state.summary is not None:
-            # Info box about AI provider
-            if ai_provider != "None (Rule-based)" and not api_key:
-                st.markdown("""
-                <div style='background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); 
-                            padding: 20px; border-radius: 15px; color: white; margin-bottom: 20px;'>
-                    <h4 style='margin: 0; color: white;'>⚠️ API Key Required</h4>
-                    <p style='margin: 10px 0 0 0;'>Please enter your API key in the sidebar or select "None (Rule-based)" to continue.</p>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col2:
-                if st.button("🤖 Generate AI Insights", use_container_width=True, type="primary"):
-                    with st.spinner("🧠 Analyzing data and generating insights..."):
-                        # Prepare data for AI
-                        df_sample = st.session_state.df_kpi.head(20).to_string()
-                        summary = st.session_state.summary
-                        
-                        # Generate insights based on provider
-                        if ai_provider == "OpenAI GPT-4" and api_key:
-                            insights = generate_insights_openai(summary, df_sample, api_key)
-                        elif ai_provider == "Google Gemini" and api_key:
-                            insights = generate_insights_gemini(summary, df_sample, api_key)
-                        else:
-                            insights = generate_fallback_insights(summary)
-                        
-                        st.session_state.insights = insights
-                        st.success("✅ Insights generated successfully!")
-                        st.balloons()
-                        st.rerun()
-            
-            st.markdown("<br>", unsafe_allow_html=True)
-            
-            # Display insights if available
-            if st.session_state.insights is not None:
-                insights = st.session_state.insights
-                
-                # Key Insights
-                if insights.get('key_insights'):
-                    st.markdown("""
-                    <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                                padding: 25px; border-radius: 15px; margin: 20px 0; color: white;'>
-                        <h3 style='margin: 0 0 15px 0; color: white;'>🔍 Key Insights</h3>
-                    """, unsafe_allow_html=True)
-                    
-                    for i, insight in enumerate(insights['key_insights'], 1):
-                        st.markdown(f"<p style='color: white; margin: 10px 0; font-size: 1.05rem;'><strong>{i}.</strong> {insight}</p>", unsafe_allow_html=True)
-                    
-                    st.markdown("</div>", unsafe_allow_html=True)
-                
-                # Trend Analysis
-                if insights.get('trends'):
-                    st.markdown("""
-                    <div style='background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); 
-                                padding: 25px; border-radius: 15px; margin: 20px 0; color: white;'>
-                        <h3 style='margin: 0 0 15px 0; color: white;'>📈 Trend Analysis</h3>
-                    """, unsafe_allow_html=True)
-                    
-                    for i, trend in enumerate(insights['trends'], 1):
-                        st.markdown(f"<p style='color: white; margin: 10px 0; font-size: 1.05rem;'><strong>{i}.</strong> {trend}</p>", unsafe_allow_html=True)
-                    
-                    st.markdown("</div>", unsafe_allow_html=True)
-                
-                # Performance Issues
-                if insights.get('issues'):
-                    st.markdown("""
-                    <div style='background: linear-gradient(135deg, #fa709a 0%, #fee140 100%); 
-                                padding: 25px; border-radius: 15px; margin: 20px 0; color: #333;'>
-                        <h3 style='margin: 0 0 15px 0; color: #333;'>⚠️ Performance Issues</h3>
-                    """, unsafe_allow_html=True)
-                    
-                    for i, issue in enumerate(insights['issues'], 1):
-                        st.markdown(f"<p style='color: #333; margin: 10px 0; font-size: 1.05rem;'><strong>{i}.</strong> {issue}</p>", unsafe_allow_html=True)
-                    
-                    st.markdown("</div>", unsafe_allow_html=True)
-                
-                # Recommendations
-                if insights.get('recommendations'):
-                    st.markdown("""
-                    <div style='background: linear-gradient(135deg, #56ab2f 0%, #a8e063 100%); 
-                                padding: 25px; border-radius: 15px; margin: 20px 0; color: white;'>
-                        <h3 style='margin: 0 0 15px 0; color: white;'>💡 Actionable Recommendations</h3>
-                    """, unsafe_allow_html=True)
-                    
-                    for i, rec in enumerate(insights['recommendations'], 1):
-                        st.markdown(f"<p style='color: white; margin: 10px 0; font-size: 1.05rem;'><strong>{i}.</strong> {rec}</p>", unsafe_allow_html=True)
-                    
-                    st.markdown("</div>", unsafe_allow_html=True)
-        else:
-            st.markdown("""
-            <div class='info-box'>
-                <h3 style='margin: 0; color: white;'>👆 Getting Started</h3>
-                <p style='margin: 10px 0 0 0;'>Please upload and process data first.</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # Show charts if available
-        if st.session_state.charts is not None:
-            st.divider()
-            st.markdown("### 📊 Performance Visualizations")
-            
-            chart_cols = st.columns(1)
-            for chart_name, chart_path in st.session_state.charts.items():
-                if os.path.exists(chart_path):
-                    st.image(chart_path, use_container_width=True)
-                    st.markdown("<br>", unsafe_allow_html=True)
-    
+        _tab_insights(ai_provider, api_key)
+
     # Tab 4: Report Generation
     with tab4:
-        st.markdown("## 📄 Generate Executive Report")
-        
-        if st.session_state.summary and st.session_state.insights:
-            # Report format display
-            st.markdown(f"""
-            <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                        padding: 25px; border-radius: 15px; color: white; text-align: center; margin-bottom: 30px;'>
-                <h3 style='margin: 0; color: white;'>📊 Report Configuration</h3>
-                <p style='margin: 15px 0 0 0; font-size: 1.2rem;'><strong>Selected Format:</strong> {report_format}</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col2:
-                if st.button("📄 Generate Report", use_container_width=True, type="primary"):
-                    with st.spinner("📝 Generating professional report..."):
-                        output_dir = ensure_output_dir("output")
-                        timestamp = get_timestamp()
-                        
-                        # Ensure charts are generated
-                        if st.session_state.charts is None:
-                            charts = generate_all_charts(st.session_state.df_kpi, output_dir)
-                            st.session_state.charts = charts
-                        
-                        report_files = []
-                        
-                        # Generate PDF
-                        if report_format in ["PDF", "Both"]:
-                            pdf_path = os.path.join(output_dir, f"campaign_report_{timestamp}.pdf")
-                            create_pdf_report(
-                                st.session_state.summary,
-                                st.session_state.insights,
-                                st.session_state.charts,
-                                pdf_path
-                            )
-                            report_files.append(("PDF", pdf_path))
-                        
-                        # Generate PPTX
-                        if report_format in ["PowerPoint (PPTX)", "Both"]:
-                            pptx_path = os.path.join(output_dir, f"campaign_report_{timestamp}.pptx")
-                            create_pptx_report(
-                                st.session_state.summary,
-                                st.session_state.insights,
-                                st.session_state.charts,
-                                pptx_path
-                            )
-                            report_files.append(("PPTX", pptx_path))
-                        
-                        st.success("✅ Report generated successfully!")
-                        st.balloons()
-                        
-                        # Download section
-                        st.markdown("<br>", unsafe_allow_html=True)
-                        st.markdown("""
-                        <div style='background: linear-gradient(135deg, #56ab2f 0%, #a8e063 100%); 
-                                    padding: 25px; border-radius: 15px; color: white; text-align: center;'>
-                            <h3 style='margin: 0; color: white;'>📥 Download Your Reports</h3>
-                            <p style='margin: 10px 0 0 0;'>Your professional reports are ready!</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        st.markdown("<br>", unsafe_allow_html=True)
-                        
-                        # Download buttons in columns
-                        download_cols = st.columns(len(report_files))
-                        
-                        for idx, (format_name, file_path) in enumerate(report_files):
-                            with download_cols[idx]:
-                                with open(file_path, "rb") as file:
-                                    file_data = file.read()
-                                    file_name = os.path.basename(file_path)
-                                    
-                                    st.download_button(
-                                        label=f"⬇️ Download {format_name}",
-                                        data=file_data,
-                                        file_name=file_name,
-                                        mime="application/pdf" if format_name == "PDF" else "application/vnd.openxmlformats-officedocument.presentationml.presentation",
-                                        use_container_width=True
-                                    )
-        else:
-            st.markdown("""
-            <div class='info-box'>
-                <h3 style='margin: 0; color: white;'>📋 Checklist Before Generating Report</h3>
-                <p style='margin: 15px 0 10px 0;'>Complete these steps first:</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Show checklist with better styling
-            checklist_items = [
-                ("Upload data", st.session_state.df_raw is not None),
-                ("Clean & process data", st.session_state.df_clean is not None),
-                ("Calculate KPIs", st.session_state.summary is not None),
-                ("Generate insights", st.session_state.insights is not None)
-            ]
-            
-            for item, completed in checklist_items:
-                icon = "✅" if completed else "❌"
-                color = "#56ab2f" if completed else "#f5576c"
-                st.markdown(f"""
-                <div style='background: {color}; color: white; padding: 15px; 
-                            border-radius: 10px; margin: 10px 0; font-size: 1.1rem;'>
-                    {icon} <strong>{item}</strong>
-                </div>
-                """, unsafe_allow_html=True)
+        _tab_reports(report_format)
+
 
 
 if __name__ == "__main__":
@@ -1,37 +1,114 @@
 """
 AI-powered insights generation using LLMs (GPT-4 or Gemini).
 """
+import asyncio
+import hashlib
+import io
 import os
-from typing import Dict, Any, Optional, List
+import re
+import time
+from typing import Callable, Dict, Any, Optional, List
 import json
 
+import pandas as pd
+import streamlit as st
 
-def generate_insights_openai(summary: Dict[str, Any], df_sample: str, api_key: str) -> Dict[str, List[str]]:
-    """
-    Generate insights using OpenAI GPT-4.
-    
-    Args:
-        summary: Dictionary of summary metrics
-        df_sample: String representation of sample data
-        api_key: OpenAI API key
-        
-    Returns:
-        Dictionary with insights, trends, issues, and recommendations
-    """
+
+def _key_hash(api_key: str) -> str:
+    """Hash an API key so it can be used as a cache key without storing it."""
+    return hashlib.blake2b(api_key.encode(), digest_size=16).hexdigest()
+
+
+@st.cache_resource(show_spinner=False)
+def _openai_client(api_key_hash: str, _api_key: str):
+    """One OpenAI client per key - reuses the HTTP connection pool."""
+    from openai import OpenAI
+    return OpenAI(api_key=_api_key)
+
+
+@st.cache_resource(show_spinner=False)
+def _async_openai_client(api_key_hash: str, _api_key: str):
+    """One AsyncOpenAI client per key - reuses the HTTP connection pool."""
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=_api_key)
+
+
+@st.cache_resource(show_spinner=False)
+def _gemini_model(api_key_hash: str, _api_key: str):
+    """One configured Gemini model per key (serves sync and async calls)."""
+    import google.generativeai as genai
+    genai.configure(api_key=_api_key)
+    return genai.GenerativeModel('gemini-1.5-flash')
+
+
+# Content-addressed response cache shared by all providers. Unlike the
+# st.cache_data layer in the app this survives cache clears and is
+# shared across sessions, so identical prompts never re-hit the network.
+_CACHE_DIR = '.insights_cache'
+
+
+def _cache_key(summary: Dict[str, Any], df_sample: str, model_name: str) -> str:
+    """Derive a stable key from everything that shapes the response."""
+    payload = json.dumps(summary, sort_keys=True) + df_sample + model_name
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _cache_get(key: str) -> Optional[Dict[str, List[str]]]:
+    """Return the cached response for key, or None."""
     try:
-        from openai import OpenAI
-        
-        client = OpenAI(api_key=api_key)
-        
-        # Create prompt
-        prompt = f"""
+        with open(os.path.join(_CACHE_DIR, f'{key}.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_put(key: str, result: Dict[str, List[str]]) -> None:
+    """Store a parsed response; cache failures never fail the caller."""
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        with open(os.path.join(_CACHE_DIR, f'{key}.json'), 'w') as f:
+            json.dump(result, f)
+    except OSError:
+        pass
+
+
+# Schema for the single structured-output request covering all four
+# insight sections - one round-trip instead of one per section, and the
+# model cannot drift from the shape Tab 3 consumes
+_INSIGHTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "key_insights": {"type": "array", "items": {"type": "string"}},
+        "trends": {"type": "array", "items": {"type": "string"}},
+        "issues": {"type": "array", "items": {"type": "string"}},
+        "recommendations": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["key_insights", "trends", "issues", "recommendations"],
+    "additionalProperties": False,
+}
+
+_OPENAI_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "campaign_insights",
+        "strict": True,
+        "schema": _INSIGHTS_SCHEMA,
+    },
+}
+
+_GEMINI_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+
+# Static prompt body built once at import; _build_prompt only fills in
+# the two dynamic slots
+_PROMPT_TEMPLATE = """
 You are an expert AdTech data analyst. Analyze the following campaign performance data and provide insights.
 
 SUMMARY METRICS:
-{json.dumps(summary, indent=2)}
+{summary}
 
 SAMPLE DATA:
-{df_sample}
+{sample}
 
 Please provide:
 1. **Top 5 Key Insights**: Identify the most important findings from the data
@@ -47,97 +124,428 @@ Format your response as JSON with these keys:
     "recommendations": ["recommendation 1", "recommendation 2", ...]
 }}
 """
-        
-        response = client.chat.completions.create(
+
+
+def _build_prompt(summary: Dict[str, Any], df_sample: str, json_only: bool = False) -> str:
+    """
+    Construct the shared analysis prompt used by both providers.
+
+    Args:
+        summary: Dictionary of summary metrics
+        df_sample: String representation of sample data
+        json_only: Append an instruction to return bare JSON (for models
+            without a native JSON response mode)
+
+    Returns:
+        Prompt string
+    """
+    prompt = _PROMPT_TEMPLATE.format(
+        summary=json.dumps(summary, indent=2), sample=df_sample
+    )
+    if json_only:
+        prompt += "\nReturn ONLY the JSON object, nothing else.\n"
+    return prompt
+
+
+def build_sample(df: pd.DataFrame, n: int = 20) -> str:
+    """
+    Build a token-efficient sample of a frame for LLM prompts.
+
+    Head + middle + tail rows give the model coverage of both ends of
+    the date range plus the interior, and CSV is both cheaper to
+    produce than to_string and markedly fewer prompt tokens.
+
+    Args:
+        df: DataFrame to sample
+        n: Rows to take from each of head, middle and tail
+
+    Returns:
+        CSV string of the sampled rows
+    """
+    if len(df) <= 3 * n:
+        return df.to_csv(index=False)
+    # An actual middle slice - a random sample could repeat head/tail
+    # rows and does not specifically represent the interior
+    mid = len(df) // 2 - n // 2
+    parts = [df.head(n), df.iloc[mid:mid + n], df.tail(n)]
+    return pd.concat(parts).to_csv(index=False)
+
+
+def generate_insights_openai(summary: Dict[str, Any], df_sample: str, api_key: str,
+                             on_chunk: Optional[Callable[[str], None]] = None,
+                             raise_on_error: bool = False) -> Dict[str, List[str]]:
+    """
+    Generate insights using OpenAI GPT-4.
+
+    Args:
+        summary: Dictionary of summary metrics
+        df_sample: String representation of sample data
+        api_key: OpenAI API key
+        on_chunk: Optional callback receiving the accumulated response
+            text as it streams in, for progressive UI updates
+        raise_on_error: Re-raise API failures instead of returning the
+            rule-based fallback, so callers that cache results do not
+            store the fallback
+
+    Returns:
+        Dictionary with insights, trends, issues, and recommendations
+    """
+    try:
+        cache_key = _cache_key(summary, df_sample, 'gpt-4o')
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        client = _openai_client(_key_hash(api_key), api_key)
+
+        prompt = _build_prompt(summary, df_sample)
+
+        messages = [
+            {"role": "system", "content": "You are an expert AdTech analyst providing data-driven insights."},
+            {"role": "user", "content": prompt}
+        ]
+
+        if on_chunk is not None:
+            # Stream tokens so the caller can render progress instead of
+            # blocking on the full generation
+            stream = client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                temperature=0.7,
+                response_format=_OPENAI_RESPONSE_FORMAT,
+                stream=True
+            )
+            parts = []
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content or ""
+                if delta:
+                    parts.append(delta)
+                    on_chunk("".join(parts))
+            content = "".join(parts)
+        else:
+            response = client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                temperature=0.7,
+                response_format=_OPENAI_RESPONSE_FORMAT
+            )
+            content = response.choices[0].message.content
+
+        result = json.loads(content)
+        _cache_put(cache_key, result)
+        return result
+
+    except Exception as e:
+        if raise_on_error:
+            raise
+        print(f"Error generating OpenAI insights: {str(e)}")
+        return generate_fallback_insights(summary)
+
+
+def generate_insights_gemini(summary: Dict[str, Any], df_sample: str, api_key: str,
+                             on_chunk: Optional[Callable[[str], None]] = None,
+                             raise_on_error: bool = False) -> Dict[str, List[str]]:
+    """
+    Generate insights using Google Gemini.
+
+    Args:
+        summary: Dictionary of summary metrics
+        df_sample: String representation of sample data
+        api_key: Google API key
+        on_chunk: Optional callback receiving the accumulated response
+            text as it streams in, for progressive UI updates
+        raise_on_error: Re-raise API failures instead of returning the
+            rule-based fallback, so callers that cache results do not
+            store the fallback
+
+    Returns:
+        Dictionary with insights, trends, issues, and recommendations
+    """
+    try:
+        cache_key = _cache_key(summary, df_sample, 'gemini-1.5-flash')
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        model = _gemini_model(_key_hash(api_key), api_key)
+
+        prompt = _build_prompt(summary, df_sample, json_only=True)
+
+        if on_chunk is not None:
+            response = model.generate_content(
+                prompt, generation_config=_GEMINI_GENERATION_CONFIG, stream=True
+            )
+            parts = []
+            for chunk in response:
+                # Final/safety-blocked chunks carry no parts, and
+                # chunk.text raises on those rather than returning ''
+                if chunk.parts:
+                    parts.append(chunk.text)
+                    on_chunk("".join(parts))
+            text = "".join(parts)
+        else:
+            response = model.generate_content(
+                prompt, generation_config=_GEMINI_GENERATION_CONFIG
+            )
+            text = response.text
+
+        result = json.loads(_extract_json(text))
+        _cache_put(cache_key, result)
+        return result
+
+    except Exception as e:
+        if raise_on_error:
+            raise
+        print(f"Error generating Gemini insights: {str(e)}")
+        return generate_fallback_insights(summary)
+
+
+# Matches a fenced block with an optional (any-case) json language tag
+_JSON_FENCE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.S | re.I)
+
+
+def _extract_json(text: str) -> str:
+    """
+    Strip markdown code fences from a model response.
+
+    One regex scan instead of chained startswith/endswith slicing; also
+    handles leading prose, uppercase language tags, and stray whitespace
+    around the fence.
+
+    Args:
+        text: Raw response text
+
+    Returns:
+        The JSON payload without surrounding fences
+    """
+    match = _JSON_FENCE.search(text)
+    return match.group(1) if match else text.strip()
+
+
+async def generate_insights_openai_async(summary: Dict[str, Any], df_sample: str, api_key: str,
+                                          raise_on_error: bool = False) -> Dict[str, List[str]]:
+    """
+    Async variant of generate_insights_openai using the AsyncOpenAI client.
+
+    Args:
+        summary: Dictionary of summary metrics
+        df_sample: String representation of sample data
+        api_key: OpenAI API key
+        raise_on_error: Re-raise API failures instead of returning the
+            rule-based fallback
+
+    Returns:
+        Dictionary with insights, trends, issues, and recommendations
+    """
+    try:
+        cache_key = _cache_key(summary, df_sample, 'gpt-4o')
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        client = _async_openai_client(_key_hash(api_key), api_key)
+
+        prompt = _build_prompt(summary, df_sample)
+
+        response = await client.chat.completions.create(
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are an expert AdTech analyst providing data-driven insights."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.7,
-            response_format={"type": "json_object"}
+            response_format=_OPENAI_RESPONSE_FORMAT
         )
-        
+
         result = json.loads(response.choices[0].message.content)
+        _cache_put(cache_key, result)
         return result
-        
+
     except Exception as e:
+        if raise_on_error:
+            raise
         print(f"Error generating OpenAI insights: {str(e)}")
         return generate_fallback_insights(summary)
 
 
-def generate_insights_gemini(summary: Dict[str, Any], df_sample: str, api_key: str) -> Dict[str, List[str]]:
+async def generate_insights_gemini_async(summary: Dict[str, Any], df_sample: str, api_key: str,
+                                          raise_on_error: bool = False) -> Dict[str, List[str]]:
     """
-    Generate insights using Google Gemini.
-    
+    Async variant of generate_insights_gemini.
+
     Args:
         summary: Dictionary of summary metrics
         df_sample: String representation of sample data
         api_key: Google API key
-        
+        raise_on_error: Re-raise API failures instead of returning the
+            rule-based fallback
+
     Returns:
         Dictionary with insights, trends, issues, and recommendations
     """
     try:
-        import google.generativeai as genai
-        
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-pro')
-        
-        # Create prompt
-        prompt = f"""
-You are an expert AdTech data analyst. Analyze the following campaign performance data and provide insights.
+        cache_key = _cache_key(summary, df_sample, 'gemini-1.5-flash')
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
 
-SUMMARY METRICS:
-{json.dumps(summary, indent=2)}
-
-SAMPLE DATA:
-{df_sample}
+        model = _gemini_model(_key_hash(api_key), api_key)
 
-Please provide:
-1. **Top 5 Key Insights**: Identify the most important findings from the data
-2. **Trend Analysis**: Describe any trends in CTR, spend, conversions, or revenue
-3. **Performance Issues**: Highlight any red flags or areas of concern
-4. **Actionable Recommendations**: Provide 5 specific, actionable recommendations to improve campaign performance
+        prompt = _build_prompt(summary, df_sample, json_only=True)
 
-Format your response as JSON with these keys:
-{{
-    "key_insights": ["insight 1", "insight 2", ...],
-    "trends": ["trend 1", "trend 2", ...],
-    "issues": ["issue 1", "issue 2", ...],
-    "recommendations": ["recommendation 1", "recommendation 2", ...]
-}}
+        response = await model.generate_content_async(
+            prompt, generation_config=_GEMINI_GENERATION_CONFIG
+        )
 
-Return ONLY the JSON object, nothing else.
-"""
-        
-        response = model.generate_content(prompt)
-        
-        # Extract JSON from response
-        text = response.text.strip()
-        # Remove markdown code blocks if present
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        
-        result = json.loads(text.strip())
+        result = json.loads(_extract_json(response.text))
+        _cache_put(cache_key, result)
         return result
-        
+
     except Exception as e:
+        if raise_on_error:
+            raise
         print(f"Error generating Gemini insights: {str(e)}")
         return generate_fallback_insights(summary)
 
 
+def generate_insights_batch(summaries: List[Dict[str, Any]], api_key: str,
+                            df_samples: Optional[List[str]] = None,
+                            poll_interval: int = 60,
+                            timeout: int = 24 * 3600) -> List[Dict[str, List[str]]]:
+    """
+    Generate insights for many summaries through the OpenAI Batch API.
+
+    Batched requests cost half the synchronous rate and get higher rate
+    limits, with results within 24h - suited to scheduled/report-queue
+    workloads, not the interactive path (which stays on the single-call
+    functions above).
+
+    Args:
+        summaries: List of summary-metric dictionaries
+        api_key: OpenAI API key
+        df_samples: Optional per-summary sample-data strings
+        poll_interval: Seconds between batch status polls
+        timeout: Seconds to wait before giving up on the batch
+
+    Returns:
+        List of insight dictionaries in input order; entries fall back
+        to rule-based insights if the batch fails or items error
+    """
+    try:
+        client = _openai_client(_key_hash(api_key), api_key)
+
+        if df_samples is None:
+            df_samples = [''] * len(summaries)
+
+        lines = []
+        for i, (summary, sample) in enumerate(zip(summaries, df_samples)):
+            lines.append(json.dumps({
+                "custom_id": f"insights-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": "gpt-4o",
+                    "messages": [
+                        {"role": "system", "content": "You are an expert AdTech analyst providing data-driven insights."},
+                        {"role": "user", "content": _build_prompt(summary, sample)}
+                    ],
+                    "temperature": 0.7,
+                    "response_format": _OPENAI_RESPONSE_FORMAT,
+                },
+            }))
+
+        batch_file = client.files.create(
+            file=io.BytesIO("\n".join(lines).encode()), purpose="batch"
+        )
+        batch = client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+
+        deadline = time.time() + timeout
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            if time.time() > deadline:
+                raise TimeoutError(f"Batch {batch.id} still {batch.status} after {timeout}s")
+            time.sleep(poll_interval)
+            batch = client.batches.retrieve(batch.id)
+
+        # Pre-fill with fallbacks so failed items still yield something
+        results = [generate_fallback_insights(s) for s in summaries]
+        if batch.status == "completed" and batch.output_file_id:
+            for line in client.files.content(batch.output_file_id).text.splitlines():
+                record = json.loads(line)
+                idx = int(record["custom_id"].rsplit("-", 1)[1])
+                body = record.get("response", {}).get("body") or {}
+                if body.get("choices"):
+                    results[idx] = json.loads(body["choices"][0]["message"]["content"])
+        return results
+
+    except Exception as e:
+        print(f"Error generating batch insights: {str(e)}")
+        return [generate_fallback_insights(s) for s in summaries]
+
+
+async def gather_insights(requests: List[tuple]) -> List[Dict[str, List[str]]]:
+    """
+    Run several insight requests concurrently.
+
+    Wall time is max(latency) instead of the sum, so generating insights
+    for multiple summaries (or from multiple providers) overlaps the
+    network round-trips.
+
+    Args:
+        requests: List of (provider, summary, df_sample, api_key) tuples,
+            where provider is 'openai' or 'gemini'
+
+    Returns:
+        List of insight dictionaries in request order
+    """
+    tasks = []
+    for provider, summary, df_sample, api_key in requests:
+        if provider == 'openai':
+            tasks.append(generate_insights_openai_async(summary, df_sample, api_key))
+        else:
+            tasks.append(generate_insights_gemini_async(summary, df_sample, api_key))
+    return await asyncio.gather(*tasks)
+
+
+# Rule table driving generate_fallback_insights. Per metric: the
+# comparator and threshold that flag a problem, the issue and
+# recommendation emitted when breached, the insight emitted otherwise
+# (None to stay silent), and an insight emitted regardless (CPC reports
+# its average either way).
+_FALLBACK_RULES = (
+    ('overall_CTR', 'lt', 1.0,
+     "Low CTR of {v:.2f}% indicates poor ad relevance or targeting",
+     "Improve ad copy and creative to increase engagement",
+     "CTR of {v:.2f}% shows good engagement",
+     None),
+    ('overall_CPC', 'gt', 2.0,
+     "High CPC of ${v:.2f} may impact profitability",
+     "Optimize bidding strategy to reduce cost per click",
+     None,
+     "Average CPC is ${v:.2f}"),
+    ('overall_ROAS', 'lt', 2.0,
+     "ROAS of {v:.2f} is below target threshold",
+     "Focus on high-converting audiences and reduce spend on underperforming segments",
+     "Strong ROAS of {v:.2f} indicates profitable campaigns",
+     None),
+    ('overall_Conversion_Rate', 'lt', 2.0,
+     "Conversion rate of {v:.2f}% needs improvement",
+     "Optimize landing pages and checkout flow",
+     "Conversion rate of {v:.2f}% is performing well",
+     None),
+)
+
+
 def generate_fallback_insights(summary: Dict[str, Any]) -> Dict[str, List[str]]:
     """
     Generate basic rule-based insights when API is unavailable.
-    
+
     Args:
         summary: Dictionary of summary metrics
-        
+
     Returns:
         Dictionary with basic insights
     """
@@ -147,39 +555,21 @@ def generate_fallback_insights(summary: Dict[str, Any]) -> Dict[str, List[str]]:
         "issues": [],
         "recommendations": []
     }
-    
-    # Basic insights based on metrics
-    if 'overall_CTR' in summary:
-        ctr = summary['overall_CTR']
-        if ctr < 1.0:
-            insights['issues'].append(f"Low CTR of {ctr:.2f}% indicates poor ad relevance or targeting")
-            insights['recommendations'].append("Improve ad copy and creative to increase engagement")
-        else:
-            insights['key_insights'].append(f"CTR of {ctr:.2f}% shows good engagement")
-    
-    if 'overall_CPC' in summary:
-        cpc = summary['overall_CPC']
-        insights['key_insights'].append(f"Average CPC is ${cpc:.2f}")
-        if cpc > 2.0:
-            insights['issues'].append(f"High CPC of ${cpc:.2f} may impact profitability")
-            insights['recommendations'].append("Optimize bidding strategy to reduce cost per click")
-    
-    if 'overall_ROAS' in summary:
-        roas = summary['overall_ROAS']
-        if roas < 2.0:
-            insights['issues'].append(f"ROAS of {roas:.2f} is below target threshold")
-            insights['recommendations'].append("Focus on high-converting audiences and reduce spend on underperforming segments")
-        else:
-            insights['key_insights'].append(f"Strong ROAS of {roas:.2f} indicates profitable campaigns")
-    
-    if 'overall_Conversion_Rate' in summary:
-        cvr = summary['overall_Conversion_Rate']
-        if cvr < 2.0:
-            insights['issues'].append(f"Conversion rate of {cvr:.2f}% needs improvement")
-            insights['recommendations'].append("Optimize landing pages and checkout flow")
-        else:
-            insights['key_insights'].append(f"Conversion rate of {cvr:.2f}% is performing well")
-    
+
+    # Basic insights based on metrics, driven by the rule table above
+    for key, direction, threshold, issue, rec, good, always in _FALLBACK_RULES:
+        if key not in summary:
+            continue
+        v = summary[key]
+        if always:
+            insights['key_insights'].append(always.format(v=v))
+        breached = v > threshold if direction == 'gt' else v < threshold
+        if breached:
+            insights['issues'].append(issue.format(v=v))
+            insights['recommendations'].append(rec.format(v=v))
+        elif good:
+            insights['key_insights'].append(good.format(v=v))
+
     # Add generic recommendations
     insights['recommendations'].extend([
         "Monitor performance daily and adjust bids based on ROI",
@@ -1,9 +1,128 @@
 """
 Data processing and cleaning module.
 """
+import re
+
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, NamedTuple, Optional
+
+# Copy-on-write shares column blocks until one is actually replaced,
+# which makes the shallow copies below safe and O(1) instead of a full
+# frame memcpy per pipeline stage
+pd.options.mode.copy_on_write = True
+
+# Currency/thousands/percent characters stripped from numeric-looking
+# text columns - one compiled pattern, one pass per column
+_CLEAN_RE = re.compile(r'[$,%]')
+
+# Column-name keywords that mark a column as carrying campaign numbers.
+# Singular forms, matching the substrings calculate_kpis' column mapper
+# uses, so e.g. an 'Impression' column classifies the same way it maps
+_NUMERIC_KEYWORDS = ('impression', 'click', 'spend', 'conversion', 'revenue',
+                     'cost', 'sales', 'cpc', 'cpm', 'ctr')
+
+
+def _classify_columns(df: pd.DataFrame) -> Dict[str, str]:
+    """
+    Classify every column as 'date', 'numeric' or 'text' in one pass.
+
+    The result is stashed on df.attrs['schema'] by clean_data so the
+    downstream stages reuse it instead of re-running the name scans.
+
+    Args:
+        df: DataFrame to classify
+
+    Returns:
+        Mapping of column name to 'date' | 'numeric' | 'text'
+    """
+    schema = {}
+    for col in df.columns:
+        lc = col.lower()
+        if lc == 'day' or 'date' in lc:
+            schema[col] = 'date'
+        elif any(keyword in lc for keyword in _NUMERIC_KEYWORDS):
+            schema[col] = 'numeric'
+        else:
+            schema[col] = 'text'
+    return schema
+
+
+class SummaryMetrics(NamedTuple):
+    """
+    Summary of campaign totals and overall KPIs.
+
+    A NamedTuple (rather than a dict) so equal summaries hash equally and
+    cheaply - this is what makes cache keys on the summary stable.
+    Fields are None when the source column was absent from the data.
+    """
+    total_impressions: Optional[float] = None
+    avg_impressions: Optional[float] = None
+    total_clicks: Optional[float] = None
+    avg_clicks: Optional[float] = None
+    total_spend: Optional[float] = None
+    avg_spend: Optional[float] = None
+    total_conversions: Optional[float] = None
+    avg_conversions: Optional[float] = None
+    total_revenue: Optional[float] = None
+    avg_revenue: Optional[float] = None
+    overall_CTR: Optional[float] = None
+    overall_CPC: Optional[float] = None
+    overall_CPM: Optional[float] = None
+    overall_Conversion_Rate: Optional[float] = None
+    overall_ROAS: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, float]:
+        """Return only the metrics that were actually computed."""
+        return {k: v for k, v in self._asdict().items() if v is not None}
+
+# Optional: Numba JIT for the elementwise KPI arithmetic
+try:
+    import numba as nb
+
+    @nb.njit(parallel=True, fastmath=True, cache=True)
+    def _kpi_kernel(impressions, clicks, spend, conversions, revenue):
+        """Compute all five KPI columns in one parallel pass."""
+        n = impressions.shape[0]
+        ctr = np.zeros(n)
+        cpc = np.zeros(n)
+        cpm = np.zeros(n)
+        cvr = np.zeros(n)
+        roas = np.zeros(n)
+        for i in nb.prange(n):
+            if impressions[i] > 0:
+                ctr[i] = clicks[i] / impressions[i] * 100.0
+                cpm[i] = spend[i] / impressions[i] * 1000.0
+            if clicks[i] > 0:
+                cpc[i] = spend[i] / clicks[i]
+                cvr[i] = conversions[i] / clicks[i] * 100.0
+            if spend[i] > 0:
+                roas[i] = revenue[i] / spend[i]
+        return ctr, cpc, cpm, cvr, roas
+
+    @nb.njit(parallel=True, cache=True)
+    def _reduce_kernel(a):
+        """Column sums and means of a 2D array in one streamed pass."""
+        n, m = a.shape
+        out = np.zeros((2, m))
+        for j in nb.prange(m):
+            s = 0.0
+            for i in range(n):
+                s += a[i, j]
+            out[0, j] = s
+            out[1, j] = s / n
+        return out
+
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
+# Optional: numexpr fuses a guarded division into one multithreaded pass
+try:
+    import numexpr as ne
+    _HAS_NUMEXPR = True
+except ImportError:
+    _HAS_NUMEXPR = False
 
 
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
@@ -16,29 +135,31 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         Cleaned DataFrame
     """
-    df_clean = df.copy()
-    
+    df_clean = df.copy(deep=False)
+
+    # One classification pass drives every transform below; downstream
+    # stages pick it up from df.attrs instead of re-scanning names
+    schema = _classify_columns(df_clean)
+
     # Convert date columns if they exist
-    date_columns = ['date', 'Date', 'DATE', 'day', 'Day']
     for col in df_clean.columns:
-        if col in date_columns or 'date' in col.lower():
+        if schema[col] == 'date':
             try:
                 df_clean[col] = pd.to_datetime(df_clean[col], errors='coerce')
             except:
                 pass
-    
+
     # Clean numeric columns - remove commas, currency symbols, etc.
-    numeric_candidates = ['impressions', 'clicks', 'spend', 'conversions', 'revenue', 
-                         'cost', 'sales', 'cpc', 'cpm', 'ctr']
-    
-    for col in df_clean.columns:
-        if any(keyword in col.lower() for keyword in numeric_candidates):
-            if df_clean[col].dtype == 'object':
-                # Remove currency symbols and commas
-                df_clean[col] = df_clean[col].astype(str).str.replace('$', '', regex=False)
-                df_clean[col] = df_clean[col].str.replace(',', '', regex=False)
-                df_clean[col] = df_clean[col].str.replace('%', '', regex=False)
-                df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
+    candidate_cols = [col for col in df_clean.columns if schema[col] == 'numeric']
+
+    for col in candidate_cols:
+        if df_clean[col].dtype == 'object':
+            # Strip currency symbols, commas and percent signs in a
+            # single pass instead of three chained str.replace walks
+            df_clean[col] = pd.to_numeric(
+                df_clean[col].astype(str).str.replace(_CLEAN_RE, '', regex=True),
+                errors='coerce'
+            )
     
     # Fill NaN values with 0 for numeric columns
     numeric_cols = df_clean.select_dtypes(include=[np.number]).columns
@@ -47,7 +168,15 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     # Fill NaN values with empty string for text columns
     text_cols = df_clean.select_dtypes(include=['object']).columns
     df_clean[text_cols] = df_clean[text_cols].fillna('')
-    
+
+    # Downcast numerics - halves byte width, doubling cache residency
+    # and SIMD lane count for the KPI and summary passes downstream
+    for col in df_clean.select_dtypes('float64').columns:
+        df_clean[col] = pd.to_numeric(df_clean[col], downcast='float')
+    for col in df_clean.select_dtypes('int64').columns:
+        df_clean[col] = pd.to_numeric(df_clean[col], downcast='integer')
+
+    df_clean.attrs['schema'] = schema
     return df_clean
 
 
@@ -61,11 +190,15 @@ def calculate_kpis(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame with calculated KPIs
     """
-    df_kpi = df.copy()
-    
-    # Standardize column names (case-insensitive)
+    df_kpi = df.copy(deep=False)
+
+    # Standardize column names (case-insensitive), consulting only the
+    # columns the cleaning pass already classified as numeric
+    schema = df_kpi.attrs.get('schema') or _classify_columns(df_kpi)
     col_mapping = {}
     for col in df_kpi.columns:
+        if schema.get(col) != 'numeric':
+            continue
         col_lower = col.lower()
         if 'impression' in col_lower:
             col_mapping[col] = 'impressions'
@@ -79,100 +212,142 @@ def calculate_kpis(df: pd.DataFrame) -> pd.DataFrame:
             col_mapping[col] = 'revenue'
     
     df_kpi = df_kpi.rename(columns=col_mapping)
-    
-    # Calculate KPIs
-    # CTR = (clicks / impressions) * 100
+
+    # Fast path: when every metric column is present, compute all KPIs
+    # in one JIT-compiled parallel pass instead of five np.where scans
+    _metric_cols = ['impressions', 'clicks', 'spend', 'conversions', 'revenue']
+    if _HAS_NUMBA and all(c in df_kpi.columns for c in _metric_cols):
+        arrays = [df_kpi[c].to_numpy(dtype=np.float64) for c in _metric_cols]
+        ctr, cpc, cpm, cvr, roas = _kpi_kernel(*arrays)
+        df_kpi['CTR'] = ctr
+        df_kpi['CPC'] = cpc
+        df_kpi['CPM'] = cpm
+        df_kpi['Conversion_Rate'] = cvr
+        df_kpi['ROAS'] = roas
+        return df_kpi
+
+    # Middle tier: numexpr evaluates each KPI with its zero-guard fused
+    # into a single pass, so no inf/NaN cleanup sweep is needed after
+    if _HAS_NUMEXPR:
+        arrays = {c: df_kpi[c].to_numpy(dtype=np.float64)
+                  for c in _metric_cols if c in df_kpi.columns}
+        specs = [
+            ('CTR', ('clicks', 'impressions'),
+             "where(impressions > 0, clicks / impressions * 100, 0)"),
+            ('CPC', ('spend', 'clicks'),
+             "where(clicks > 0, spend / clicks, 0)"),
+            ('CPM', ('spend', 'impressions'),
+             "where(impressions > 0, spend / impressions * 1000, 0)"),
+            ('Conversion_Rate', ('conversions', 'clicks'),
+             "where(clicks > 0, conversions / clicks * 100, 0)"),
+            ('ROAS', ('revenue', 'spend'),
+             "where(spend > 0, revenue / spend, 0)"),
+        ]
+        for name, needed, expr in specs:
+            if all(c in arrays for c in needed):
+                df_kpi[name] = ne.evaluate(expr, local_dict=arrays)
+        return df_kpi
+
+    # Calculate KPIs with df.eval; a single cleanup sweep zeroes the
+    # divide-by-zero artifacts afterwards
+    exprs = []
     if 'clicks' in df_kpi.columns and 'impressions' in df_kpi.columns:
-        df_kpi['CTR'] = np.where(
-            df_kpi['impressions'] > 0,
-            (df_kpi['clicks'] / df_kpi['impressions']) * 100,
-            0
-        )
-    
-    # CPC = spend / clicks
+        exprs.append('CTR = clicks / impressions * 100')
     if 'spend' in df_kpi.columns and 'clicks' in df_kpi.columns:
-        df_kpi['CPC'] = np.where(
-            df_kpi['clicks'] > 0,
-            df_kpi['spend'] / df_kpi['clicks'],
-            0
-        )
-    
-    # CPM = (spend / impressions) * 1000
+        exprs.append('CPC = spend / clicks')
     if 'spend' in df_kpi.columns and 'impressions' in df_kpi.columns:
-        df_kpi['CPM'] = np.where(
-            df_kpi['impressions'] > 0,
-            (df_kpi['spend'] / df_kpi['impressions']) * 1000,
-            0
-        )
-    
-    # Conversion Rate = (conversions / clicks) * 100
+        exprs.append('CPM = spend / impressions * 1000')
     if 'conversions' in df_kpi.columns and 'clicks' in df_kpi.columns:
-        df_kpi['Conversion_Rate'] = np.where(
-            df_kpi['clicks'] > 0,
-            (df_kpi['conversions'] / df_kpi['clicks']) * 100,
-            0
-        )
-    
-    # ROAS = revenue / spend
+        exprs.append('Conversion_Rate = conversions / clicks * 100')
     if 'revenue' in df_kpi.columns and 'spend' in df_kpi.columns:
-        df_kpi['ROAS'] = np.where(
-            df_kpi['spend'] > 0,
-            df_kpi['revenue'] / df_kpi['spend'],
-            0
-        )
-    
+        exprs.append('ROAS = revenue / spend')
+
+    if exprs:
+        df_kpi.eval('\n'.join(exprs), inplace=True)
+        # One divide-by-zero cleanup instead of a mask per expression
+        kpi_cols = [e.split(' =')[0] for e in exprs]
+        df_kpi[kpi_cols] = df_kpi[kpi_cols].replace([np.inf, -np.inf], np.nan).fillna(0)
+
     return df_kpi
 
 
-def get_summary_metrics(df: pd.DataFrame) -> Dict[str, Any]:
+def process_all(df: pd.DataFrame):
+    """
+    Run the full clean -> KPI -> summary pipeline in a single call.
+
+    Fusing the three stages means the raw frame is only handed through
+    the pipeline once per dataset instead of each stage being invoked
+    (and its input re-hashed/re-scanned) separately by the caller.
+
+    Args:
+        df: Raw DataFrame
+
+    Returns:
+        Tuple of (cleaned DataFrame, KPI DataFrame, SummaryMetrics)
+    """
+    df_clean = clean_data(df)
+    df_kpi = calculate_kpis(df_clean)
+    summary = get_summary_metrics(df_kpi)
+    return df_clean, df_kpi, summary
+
+
+def get_summary_metrics(df: pd.DataFrame) -> SummaryMetrics:
     """
     Generate summary metrics for the dataset.
-    
+
     Args:
         df: DataFrame with calculated KPIs
-        
+
     Returns:
-        Dictionary of summary metrics
+        SummaryMetrics tuple; use .to_dict() for the computed values only
     """
     summary = {}
-    
-    # Aggregate totals
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    
-    for col in ['impressions', 'clicks', 'spend', 'conversions', 'revenue']:
-        if col in df.columns:
-            summary[f'total_{col}'] = df[col].sum()
-            summary[f'avg_{col}'] = df[col].mean()
-    
+
+    # Aggregate totals - one reduction over a contiguous 2D block instead
+    # of a pandas .sum()/.mean() pair (and their temporaries) per column
+    metric_cols = ['impressions', 'clicks', 'spend', 'conversions', 'revenue']
+    present = [col for col in metric_cols if col in df.columns]
+    if present and len(df):
+        arr = df[present].to_numpy(dtype=np.float64)
+        if _HAS_NUMBA:
+            reduced = _reduce_kernel(arr)
+            totals, means = reduced[0], reduced[1]
+        else:
+            totals = arr.sum(axis=0)
+            means = arr.mean(axis=0)
+        for i, col in enumerate(present):
+            summary[f'total_{col}'] = totals[i]
+            summary[f'avg_{col}'] = means[i]
+
     # Overall KPIs
-    if 'impressions' in summary and 'clicks' in summary:
+    if 'total_impressions' in summary and 'total_clicks' in summary:
         if summary['total_impressions'] > 0:
             summary['overall_CTR'] = (summary['total_clicks'] / summary['total_impressions']) * 100
         else:
             summary['overall_CTR'] = 0
     
-    if 'spend' in summary and 'clicks' in summary:
+    if 'total_spend' in summary and 'total_clicks' in summary:
         if summary['total_clicks'] > 0:
             summary['overall_CPC'] = summary['total_spend'] / summary['total_clicks']
         else:
             summary['overall_CPC'] = 0
     
-    if 'spend' in summary and 'impressions' in summary:
+    if 'total_spend' in summary and 'total_impressions' in summary:
         if summary['total_impressions'] > 0:
             summary['overall_CPM'] = (summary['total_spend'] / summary['total_impressions']) * 1000
         else:
             summary['overall_CPM'] = 0
     
-    if 'conversions' in summary and 'clicks' in summary:
+    if 'total_conversions' in summary and 'total_clicks' in summary:
         if summary['total_clicks'] > 0:
             summary['overall_Conversion_Rate'] = (summary['total_conversions'] / summary['total_clicks']) * 100
         else:
             summary['overall_Conversion_Rate'] = 0
     
-    if 'revenue' in summary and 'spend' in summary:
+    if 'total_revenue' in summary and 'total_spend' in summary:
         if summary['total_spend'] > 0:
             summary['overall_ROAS'] = summary['total_revenue'] / summary['total_spend']
         else:
             summary['overall_ROAS'] = 0
-    
-    return summary
+
+    return SummaryMetrics(**summary)
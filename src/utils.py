@@ -4,6 +4,7 @@ Utilities for data processing and helpers.
 import pandas as pd
 import os
 from datetime import datetime
+from functools import lru_cache
 
 
 def ensure_output_dir(output_dir: str = "output") -> str:
@@ -33,6 +34,7 @@ def get_timestamp() -> str:
     return datetime.now().strftime("%Y%m%d_%H%M%S")
 
 
+@lru_cache(maxsize=4096)
 def format_currency(value: float) -> str:
     """
     Format value as currency.
@@ -46,6 +48,7 @@ def format_currency(value: float) -> str:
     return f"${value:,.2f}"
 
 
+@lru_cache(maxsize=4096)
 def format_percentage(value: float) -> str:
     """
     Format value as percentage.
@@ -59,6 +62,7 @@ def format_percentage(value: float) -> str:
     return f"{value:.2f}%"
 
 
+@lru_cache(maxsize=4096)
 def format_number(value: float) -> str:
     """
     Format value as number with commas.